@@ -1,10 +1,10 @@
 import streamlit as st
-import pandas as pd
 import sqlite3
 import os
-from pyvis.network import Network
 import streamlit.components.v1 as components
 
+from network import NETWORK_FILE, rebuild_network_html
+
 # --- Page Configuration ---
 st.set_page_config(
     page_title="Journalist DB Tool",
@@ -50,163 +50,266 @@ st.markdown("""
 
 # --- Database Functions ---
 
+@st.cache_resource
 def get_db_connection():
-    """Establishes a connection to the SQLite database."""
+    """
+    Opens the SQLite connection once per server process and reuses it
+    across reruns; the cache owns its lifetime, so callers must not close
+    it. WAL mode lets reads proceed during writes, and mmap serves hot
+    pages without read() syscalls.
+    """
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None)
         conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA mmap_size=268435456")
         return conn
     except sqlite3.Error as e:
         st.error(f"Database connection error: {e}")
         return None
 
 
+def fetch_journalists(_conn, sql, params=()):
+    """
+    Runs a query and returns the rows as plain dicts. The display paths
+    just iterate rows, so skipping the DataFrame avoids pandas' block and
+    dtype machinery per query; dicts (rather than sqlite3.Row) keep the
+    results picklable for st.cache_data. The leading underscore on _conn
+    tells Streamlit's cachers to leave the live connection out of their
+    cache keys.
+    """
+    return [dict(row) for row in _conn.execute(sql, params).fetchall()]
+
+
 @st.cache_data(ttl=600)
-def get_all_journalists():
-    """Fetches all journalists from the database, including their unique rowid."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            # Fetch the unique rowid along with all other columns (*)
-            journalists = pd.read_sql_query("SELECT rowid, * FROM journalists", conn)
-            conn.close()
-            return journalists
-        except Exception as e:
-            st.warning(f"Could not read from 'journalists' table. Has the database been created? Error: {e}")
-            conn.close()
-    return pd.DataFrame()
+def get_all_journalists(_conn, page=0, page_size=40):
+    """Fetches one page of journalists, including their unique rowid; the
+    page number is part of the cache key, so each page is cached once."""
+    try:
+        # Fetch the unique rowid along with all other columns (*)
+        return fetch_journalists(
+            _conn,
+            "SELECT rowid, * FROM journalists ORDER BY rowid LIMIT ? OFFSET ?",
+            (page_size, page * page_size),
+        )
+    except Exception as e:
+        st.warning(f"Could not read from 'journalists' table. Has the database been created? Error: {e}")
+    return []
+
+
+@st.cache_data(ttl=600)
+def count_journalists(_conn):
+    """Cached total row count, used to size the page selector."""
+    return _conn.execute("SELECT COUNT(*) FROM journalists").fetchone()[0]
+
 
+@st.cache_data(ttl=600)
+def get_kategorier(_conn):
+    """Cached list of distinct categories for the search filter."""
+    return [row['Kategori'] for row in fetch_journalists(
+        _conn,
+        "SELECT DISTINCT Kategori FROM journalists WHERE Kategori IS NOT NULL ORDER BY Kategori",
+    )]
 
-def search_journalists(search_term):
+
+def build_fts_query(search_term):
     """
-    Searches for a term and includes the rowid in the results.
+    Turns a raw search string into a safe FTS5 query: the term is quoted
+    (so Swedish characters and FTS operators are taken literally) and a
+    trailing * makes it a prefix match, which suits search-as-you-type.
     """
-    conn = get_db_connection()
-    if conn:
-        try:
+    escaped = search_term.replace('"', '""')
+    return f'"{escaped}"*'
+
+
+@st.cache_data(ttl=300, max_entries=256, show_spinner=False)
+def search_journalists(_conn, search_term, kategori=None, limit=200):
+    """
+    Searches for a term using the FTS5 index and includes the rowid in the
+    results, ranked by relevance (bm25). Optionally restricts the results
+    to a single Kategori.
+    """
+    try:
+        if kategori is None:
+            query = """
+            SELECT j.rowid, j.*
+            FROM journalists_fts f
+            JOIN journalists j ON j.rowid = f.rowid
+            WHERE journalists_fts MATCH ?
+            ORDER BY bm25(journalists_fts)
+            LIMIT ?
+            """
+            params = (build_fts_query(search_term), limit)
+        else:
+            # Materialize the MATCH candidates in a CTE *before* the
+            # category filter is applied. Mixing MATCH with ordinary
+            # predicates in one WHERE clause can make SQLite's planner
+            # abandon the FTS index and fall back to a scan. The CTE
+            # oversamples (limit*10) so enough rows survive the filter.
             query = """
-            SELECT rowid, * FROM journalists
-            WHERE Ämnesområden LIKE ? OR "Analys av Position" LIKE ?
+            WITH hits AS (
+                SELECT rowid, bm25(journalists_fts) AS score
+                FROM journalists_fts
+                WHERE journalists_fts MATCH ?
+                ORDER BY score
+                LIMIT ?
+            )
+            SELECT j.rowid, j.*
+            FROM hits h
+            JOIN journalists j ON j.rowid = h.rowid
+            WHERE j.Kategori = ?
+            ORDER BY h.score
+            LIMIT ?
             """
-            search_pattern = f"%{search_term}%"
-            results = pd.read_sql_query(query, conn, params=(search_pattern, search_pattern))
-            conn.close()
-            return results
-        except Exception as e:
-            st.error(f"An error occurred during search: {e}")
-            conn.close()
-    return pd.DataFrame()
+            params = (build_fts_query(search_term), limit * 10, kategori, limit)
+        return fetch_journalists(_conn, query, params)
+    except Exception as e:
+        st.error(f"An error occurred during search: {e}")
+    return []
 
 
 def add_interest_to_journalist(rowid, new_interest):
-    """Appends a new interest to a journalist using their unique rowid."""
+    """Adds a new interest to a journalist using their unique rowid."""
     conn = get_db_connection()
     if conn and new_interest:
+        # Same normalization as the database build and the network rebuild
+        # (all periods removed, whitespace stripped), so a subject has one
+        # canonical form no matter which writer stored it.
+        subject = new_interest.replace('.', '').strip()
         try:
             cursor = conn.cursor()
-            # 1. Get current interests using the unique rowid
-            cursor.execute("SELECT Ämnesområden FROM journalists WHERE rowid = ?", (rowid,))
-            result = cursor.fetchone()
-            if result:
-                current_interests = result['Ämnesområden']
-                # Avoid adding if it already exists
-                if new_interest.strip().lower() in [i.lower() for i in current_interests.split(',')]:
-                    st.warning(f"'{new_interest}' already exists for this journalist.")
-                    return
-                updated_interests = f"{current_interests}, {new_interest.strip()}"
-                # 3. Update the database using the unique rowid
-                cursor.execute("UPDATE journalists SET Ämnesområden = ? WHERE rowid = ?", (updated_interests, rowid))
-                conn.commit()
-                st.success(f"Updated interests for journalist ID {rowid}.")
-            else:
+            # One transaction: the UNIQUE index on journalist_subjects does
+            # the duplicate check in-engine, replacing the old
+            # read-parse-rewrite of the whole Ämnesområden string.
+            cursor.execute("BEGIN")
+            cursor.execute("INSERT OR IGNORE INTO subjects (name) VALUES (?)", (subject,))
+            cursor.execute(
+                "INSERT OR IGNORE INTO journalist_subjects (journalist_id, subject_id) "
+                "SELECT ?, id FROM subjects WHERE name = ?",
+                (rowid, subject),
+            )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                st.warning(f"'{new_interest}' already exists for this journalist.")
+                return
+            # Append to the denormalized display column; the FTS triggers
+            # keep the search index current.
+            cursor.execute(
+                "UPDATE journalists SET Ämnesområden = Ämnesområden || ', ' || ? WHERE rowid = ?",
+                (subject, rowid),
+            )
+            if cursor.rowcount == 0:
+                conn.rollback()
                 st.warning(f"Could not find journalist with ID: {rowid}")
+                return
+            conn.commit()
+            # Let SQLite refresh its planner statistics after the write;
+            # cheap, and recommended for long-lived connections.
+            conn.execute("PRAGMA optimize")
+            # Re-render the static network HTML now that the data changed:
+            # a per-write cost instead of a per-view one.
+            rebuild_network_html(conn)
+            st.success(f"Updated interests for journalist ID {rowid}.")
         except sqlite3.Error as e:
+            conn.rollback()
             st.error(f"Database error while updating: {e}")
         finally:
-            conn.close()
-            # Clear the cache to reflect changes immediately
+            # Clear the caches to reflect changes immediately
             get_all_journalists.clear()
+            search_journalists.clear()
 
 
 # --- UI Display Functions ---
 
-def display_journalist(journalist):
-    """Displays a single journalist's info and uses rowid for widget keys."""
-    st.markdown(f"""
-    <div class="journalist-card">
-        <div class="journalist-name">{journalist['Namn']}</div>
-        <div class="journalist-category">{journalist['Kategori']}</div>
-        <div class="journalist-details">
-            <strong><p>📝 Ämnesområden:</p></strong>
-            <p>{journalist['Ämnesområden']}</p>
-        </div>
+# Static card markup, filled per row with format_map. Keeping it as one
+# template lets a whole page of cards be emitted in a single st.markdown
+# call instead of one frontend message per card.
+CARD_TMPL = """
+<div class="journalist-card">
+    <div class="journalist-name">{Namn}</div>
+    <div class="journalist-category">{Kategori}</div>
+    <div class="journalist-details">
+        <strong><p>📝 Ämnesområden:</p></strong>
+        <p>{Ämnesområden}</p>
     </div>
-    """, unsafe_allow_html=True)
+</div>
+"""
+
+
+@st.fragment
+def edit_journalist_fragment(rowid):
+    """
+    Edit form for a single journalist. As a fragment, saving re-runs only
+    this form instead of the whole script; the caches cleared by
+    add_interest_to_journalist make the rest of the app pick up the change
+    on its next full rerun.
+    """
+    new_interest = st.text_input("Nytt ämne:", key=f"interest_{rowid}")
+    if st.button("Spara ämne", key=f"btn_{rowid}"):
+        add_interest_to_journalist(rowid, new_interest)
+        st.rerun(scope="fragment")
+
 
-    with st.expander("Visa detaljer och redigera"):
+def display_journalist_details(journalist):
+    """Expandable detail/edit section for one journalist, labelled with the
+    name so it pairs up with the batched cards above it."""
+    with st.expander(f"Visa detaljer och redigera – {journalist['Namn']}"):
         st.write("**Typiska Plattformar:**", journalist['Typiska Plattformar'])
         st.write("**Analys av Position:**", journalist['Analys av Position'])
         st.markdown("---")
         st.subheader("Lägg till nytt ämnesområde")
+        edit_journalist_fragment(journalist['rowid'])
 
-        unique_key = journalist['rowid']
-        new_interest = st.text_input("Nytt ämne:", key=f"interest_{unique_key}")
-        if st.button("Spara ämne", key=f"btn_{unique_key}"):
-            add_interest_to_journalist(unique_key, new_interest)
-            st.rerun()
-
-
-def generate_network_visualization(df):
-    """Generates and displays an interactive network graph of journalists and subjects."""
-    net = Network(height='750px', width='100%', bgcolor='#222222', font_color='white', notebook=True)
-
-    # Set physics layout for a better-looking graph
-    net.set_options("""
-    var options = {
-      "physics": {
-        "barnesHut": {
-          "gravitationalConstant": -30000,
-          "centralGravity": 0.3,
-          "springLength": 150
-        },
-        "minVelocity": 0.75
-      }
-    }
-    """)
 
-    journalists = df['Namn'].unique()
-    subjects = set()
+def render_journalist_columns(journalists):
+    """Renders one page of journalist cards in two columns."""
+    col1, col2 = st.columns(2)
+    for col, half in ((col1, journalists[0::2]), (col2, journalists[1::2])):
+        with col:
+            # All read-only cards for the column in a single markdown call,
+            # so the frontend gets one message instead of one per card.
+            st.markdown(''.join(CARD_TMPL.format_map(j) for j in half), unsafe_allow_html=True)
+            for journalist in half:
+                display_journalist_details(journalist)
 
-    # Process subjects
-    for sub_list in df['Ämnesområden'].dropna():
-        # Clean up subjects: split by comma, strip whitespace, remove empty strings and periods.
-        cleaned_subjects = [s.strip().replace('.', '') for s in sub_list.split(',') if s.strip()]
-        subjects.update(cleaned_subjects)
 
-    # Add nodes to the graph
-    for journalist in journalists:
-        net.add_node(journalist, label=journalist, title=journalist, color='#3498db', size=25)
+@st.fragment
+def display_journalist_list(journalists, page_size=20):
+    """
+    Renders a paginated two-column list of already-fetched rows (search
+    results). As a fragment, flipping pages re-renders only the list, not
+    the query logic above it.
+    """
+    n_pages = max(1, -(-len(journalists) // page_size))
+    page = st.number_input("Sida", min_value=1, max_value=n_pages, value=1) - 1
+    render_journalist_columns(journalists[page * page_size:(page + 1) * page_size])
 
-    for subject in subjects:
-        net.add_node(subject, label=subject, title=subject, color='#e74c3c', size=15)
 
-    # Add edges connecting journalists to their subjects
-    for _, row in df.iterrows():
-        journalist_name = row['Namn']
-        if pd.notna(row['Ämnesområden']):
-            journalist_subjects = [s.strip().replace('.', '') for s in row['Ämnesområden'].split(',') if s.strip()]
-            for subject in journalist_subjects:
-                net.add_edge(journalist_name, subject)
+@st.fragment
+def display_all_journalists(page_size=40):
+    """
+    Paginated browse view backed by LIMIT/OFFSET queries, so only one page
+    of rows ever leaves SQLite no matter how large the table grows.
+    """
+    conn = get_db_connection()
+    n_pages = max(1, -(-count_journalists(conn) // page_size))
+    page = st.number_input("Sida", min_value=1, max_value=n_pages, value=1) - 1
+    render_journalist_columns(get_all_journalists(conn, page, page_size))
+
 
-    # Save and display the graph
+def generate_network_visualization():
+    """Displays the pre-rendered network graph, rebuilding it only if the
+    database has changed since the HTML file was written."""
     try:
-        path = '/tmp'
-        if not os.path.exists(path):
-            os.makedirs(path)
-        file_path = os.path.join(path, 'pyvis_graph.html')
-        net.save_graph(file_path)
-        with open(file_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        if (not os.path.exists(NETWORK_FILE)
+                or os.path.getmtime(NETWORK_FILE) < os.path.getmtime(DB_FILE)):
+            html_content = rebuild_network_html(get_db_connection())
+        else:
+            with open(NETWORK_FILE, 'r', encoding='utf-8') as f:
+                html_content = f.read()
         components.html(html_content, height=800)
     except Exception as e:
         st.error(f"Could not generate or display the graph: {e}")
@@ -230,35 +333,28 @@ def main():
         search_term = st.text_input(
             "Sök på ämne eller i analysen (t.ex. 'politik', 'liberal', 'public service')", ""
         )
+        kategori = st.selectbox("Filtrera på kategori", ["Alla kategorier"] + get_kategorier(get_db_connection()))
         if search_term:
-            results = search_journalists(search_term)
+            results = search_journalists(
+                get_db_connection(),
+                search_term,
+                kategori=None if kategori == "Alla kategorier" else kategori,
+            )
             st.subheader(f"Resultat för '{search_term}': {len(results)} träffar")
-            if not results.empty:
-                col1, col2 = st.columns(2)
-                for index, journalist in results.iterrows():
-                    with col1 if index % 2 == 0 else col2:
-                        display_journalist(journalist)
+            if results:
+                display_journalist_list(results)
             else:
                 st.warning("Inga journalister hittades.")
 
     elif app_mode == "Visa alla":
         st.header("👥 Alla Journalister")
-        all_journalists = get_all_journalists()
-        st.write(f"Visar totalt {len(all_journalists)} journalister.")
-        if not all_journalists.empty:
-            col1, col2 = st.columns(2)
-            for index, journalist in all_journalists.iterrows():
-                with col1 if index % 2 == 0 else col2:
-                    display_journalist(journalist)
+        st.write(f"Visar totalt {count_journalists(get_db_connection())} journalister.")
+        display_all_journalists()
 
     elif app_mode == "Nätverksvisualisering":
         st.header("🕸️ Nätverk av Journalister och Ämnen")
         st.info("Klicka och dra noder för att utforska nätverket. Zooma med scrollhjulet.")
-        all_journalists = get_all_journalists()
-        if not all_journalists.empty:
-            generate_network_visualization(all_journalists)
-        else:
-            st.warning("Ingen data att visualisera.")
+        generate_network_visualization()
 
 
 if __name__ == "__main__":
@@ -2,6 +2,148 @@ import pandas as pd
 import sqlite3
 import os
 
+from network import rebuild_network_html
+
+def apply_text_collation(conn):
+    """
+    Recreates the 'journalists' table with COLLATE NOCASE on the free-text
+    columns. SQLite cannot attach a collation to an existing column, so the
+    table is rebuilt and renamed (rowids stay sequential because the rows
+    are re-inserted in order). NOCASE makes equality and LIKE comparisons
+    case-insensitive and lets the indexes below serve prefix LIKE scans.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE journalists_new (
+            Kategori TEXT COLLATE NOCASE,
+            Namn TEXT,
+            Ämnesområden TEXT COLLATE NOCASE,
+            "Typiska Plattformar" TEXT,
+            "Analys av Position" TEXT COLLATE NOCASE
+        )
+    """)
+    cursor.execute("INSERT INTO journalists_new SELECT * FROM journalists")
+    cursor.execute("DROP TABLE journalists")
+    cursor.execute("ALTER TABLE journalists_new RENAME TO journalists")
+    cursor.execute("CREATE INDEX idx_amn ON journalists(Ämnesområden COLLATE NOCASE)")
+    cursor.execute('CREATE INDEX idx_analys ON journalists("Analys av Position" COLLATE NOCASE)')
+    conn.commit()
+
+
+def create_search_index(conn):
+    """
+    Builds an FTS5 full-text index over the searchable columns of the
+    'journalists' table, so the app can use MATCH instead of LIKE scans.
+
+    The index is an "external content" table: it stores only the tokenized
+    index and reads the actual text from 'journalists' via rowid. Triggers
+    keep it in sync with inserts, updates and deletes on the base table.
+    """
+    cursor = conn.cursor()
+
+    # Drop any previous index objects so the script can be re-run safely.
+    cursor.execute("DROP TABLE IF EXISTS journalists_fts")
+    for trigger in ('journalists_fts_ai', 'journalists_fts_au', 'journalists_fts_ad'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    # unicode61 with remove_diacritics handles Swedish characters (å/ä/ö)
+    # so that e.g. 'amne' and 'ämne' tokenize consistently. The prefix
+    # option stores 2-, 3- and 4-character prefix tokens so that the
+    # search-as-you-type queries ("term"*) are index lookups rather than
+    # range scans over the whole term list.
+    cursor.execute("""
+        CREATE VIRTUAL TABLE journalists_fts USING fts5(
+            Ämnesområden,
+            "Analys av Position",
+            content='journalists',
+            content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3 4'
+        )
+    """)
+
+    # Populate the index from the existing table contents.
+    cursor.execute("INSERT INTO journalists_fts(journalists_fts) VALUES('rebuild')")
+
+    # Keep the index in sync with future writes to the base table.
+    cursor.execute("""
+        CREATE TRIGGER journalists_fts_ai AFTER INSERT ON journalists BEGIN
+            INSERT INTO journalists_fts(rowid, Ämnesområden, "Analys av Position")
+            VALUES (new.rowid, new.Ämnesområden, new."Analys av Position");
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER journalists_fts_ad AFTER DELETE ON journalists BEGIN
+            INSERT INTO journalists_fts(journalists_fts, rowid, Ämnesområden, "Analys av Position")
+            VALUES ('delete', old.rowid, old.Ämnesområden, old."Analys av Position");
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER journalists_fts_au AFTER UPDATE ON journalists BEGIN
+            INSERT INTO journalists_fts(journalists_fts, rowid, Ämnesområden, "Analys av Position")
+            VALUES ('delete', old.rowid, old.Ämnesområden, old."Analys av Position");
+            INSERT INTO journalists_fts(rowid, Ämnesområden, "Analys av Position")
+            VALUES (new.rowid, new.Ämnesområden, new."Analys av Position");
+        END
+    """)
+    conn.commit()
+
+
+def create_subject_tables(conn):
+    """
+    Normalizes the comma-separated 'Ämnesområden' column into a proper
+    1-NF schema: a deduplicated 'subjects' table and a
+    'journalist_subjects' bridge table keyed on the journalists' rowids.
+
+    This lets the app resolve journalist/subject relations with indexed
+    joins instead of re-splitting strings in Python on every request.
+    """
+    cursor = conn.cursor()
+
+    # Drop any previous tables so the script can be re-run safely.
+    cursor.execute("DROP TABLE IF EXISTS journalist_subjects")
+    cursor.execute("DROP TABLE IF EXISTS subjects")
+    # NOCASE matches the collation on journalists.Ämnesområden and makes
+    # the UNIQUE constraint treat case variants ('Kvantdatorer' vs
+    # 'kvantdatorer') as the same subject.
+    cursor.execute("""
+        CREATE TABLE subjects (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE journalist_subjects (
+            journalist_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL
+        )
+    """)
+
+    # Explode the comma-separated subject lists into one (journalist, subject)
+    # pair per row, normalizing whitespace and stray periods once, here,
+    # instead of on every read in the app.
+    df = pd.read_sql_query('SELECT rowid AS journalist_id, Ämnesområden FROM journalists', conn)
+    pairs = df.assign(subj=df['Ämnesområden'].str.split(',')).explode('subj')
+    pairs['subj'] = pairs['subj'].str.replace('.', '', regex=False).str.strip()
+    pairs = pairs[pairs['subj'] != '']
+
+    cursor.executemany(
+        "INSERT OR IGNORE INTO subjects (name) VALUES (?)",
+        ((s,) for s in pairs['subj'].unique()),
+    )
+    cursor.executemany(
+        "INSERT INTO journalist_subjects (journalist_id, subject_id) "
+        "SELECT ?, id FROM subjects WHERE name = ?",
+        pairs[['journalist_id', 'subj']].itertuples(index=False),
+    )
+
+    # Indexes so both directions of the relation are O(log N) lookups. The
+    # unique index doubles as the dedup check for INSERT OR IGNORE writes.
+    cursor.execute("CREATE UNIQUE INDEX idx_js_uniq ON journalist_subjects(journalist_id, subject_id)")
+    cursor.execute("CREATE INDEX idx_js_s ON journalist_subjects(subject_id)")
+    conn.commit()
+
+
 def create_database_from_csv(csv_filepath, db_filepath):
     """
     Reads data from a CSV file and creates an SQLite database with that data.
@@ -37,10 +179,42 @@ def create_database_from_csv(csv_filepath, db_filepath):
         # - `if_exists='replace'` means if you run the script again, it will overwrite
         #   the existing table, which is useful for updates.
         # - `index=False` prevents pandas from writing its own DataFrame index as a column.
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
+        # - `method='multi'` batches 500 rows per INSERT statement instead of
+        #   one statement per row, which dominates load time on larger CSVs.
+        # fsync is turned off only for the duration of the bulk load and
+        # restored right after; a crash mid-load just means re-running the script.
+        conn.execute("PRAGMA synchronous=OFF")
+        df.to_sql(table_name, conn, if_exists='replace', index=False, method='multi', chunksize=500)
+        conn.execute("PRAGMA synchronous=NORMAL")
         print(f"✅ Data successfully written to table '{table_name}' in '{db_filepath}'.")
 
-        # --- 5. Verify and Close Connection ---
+        # --- 5. Apply case-insensitive collation to the text columns ---
+        apply_text_collation(conn)
+        print("✅ NOCASE collation and indexes applied to text columns.")
+
+        # --- 6. Build the full-text search index ---
+        create_search_index(conn)
+        print("✅ Full-text search index 'journalists_fts' created.")
+
+        # --- 7. Build the normalized subject tables ---
+        create_subject_tables(conn)
+        print("✅ Normalized tables 'subjects' and 'journalist_subjects' created.")
+
+        # --- 8. Persistent performance settings ---
+        # WAL mode sticks in the database file, so readers in the app are
+        # never blocked by a concurrent write. ANALYZE gathers planner
+        # statistics for the freshly built indexes.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("ANALYZE")
+        print("✅ WAL mode enabled and planner statistics gathered.")
+
+        # --- 9. Pre-render the network visualization ---
+        # Written once at build time (and after each edit in the app) so
+        # the visualization view only has to read the file back.
+        rebuild_network_html(conn)
+        print("✅ Network visualization pre-rendered to 'network.html'.")
+
+        # --- 10. Verify and Close Connection ---
         print("\n🔍 Verifying by reading the first 3 rows back from the database:")
         # Reading data back to confirm it's working
         verify_df = pd.read_sql_query(f"SELECT * FROM {table_name} LIMIT 3", conn)
@@ -0,0 +1,83 @@
+import pandas as pd
+from pyvis.network import Network
+
+# The pre-rendered graph lives next to journalists.db and is rewritten
+# whenever the database is rebuilt or a journalist is edited, so viewing
+# it is just a file read.
+NETWORK_FILE = 'network.html'
+
+
+def build_network_html(names, subject_pairs):
+    """
+    Builds the pyvis graph for the given journalists and (journalist,
+    subject) pairs and returns the rendered HTML.
+    """
+    net = Network(height='750px', width='100%', bgcolor='#222222', font_color='white', notebook=True)
+
+    # Set physics layout for a better-looking graph
+    net.set_options("""
+    var options = {
+      "physics": {
+        "barnesHut": {
+          "gravitationalConstant": -30000,
+          "centralGravity": 0.3,
+          "springLength": 150
+        },
+        "minVelocity": 0.75
+      }
+    }
+    """)
+
+    # Both node sets go in through bulk add_nodes calls, and the edge list
+    # is assembled directly: per-call add_edge re-scans the node id list
+    # for membership, which turns quadratic as the graph grows.
+    j_ids = list(names)
+    net.add_nodes(
+        j_ids,
+        label=j_ids,
+        title=j_ids,
+        color=['#3498db'] * len(j_ids),
+        size=[25] * len(j_ids),
+    )
+
+    subjects = list(dict.fromkeys(subject for _, subject in subject_pairs))
+    net.add_nodes(
+        subjects,
+        label=subjects,
+        title=subjects,
+        color=['#e74c3c'] * len(subjects),
+        size=[15] * len(subjects),
+    )
+
+    net.edges = [
+        {'from': journalist_name, 'to': subject}
+        for journalist_name, subject in subject_pairs
+    ]
+
+    return net.generate_html()
+
+
+def rebuild_network_html(conn, path=NETWORK_FILE):
+    """
+    Regenerates the static network HTML from the database and writes it to
+    `path`. Called at write time (database build and journalist edits) so
+    the visualization view only has to read the file back.
+    """
+    df = pd.read_sql_query("SELECT Namn, Ämnesområden FROM journalists", conn)
+
+    # Explode the comma-separated subject lists into one (journalist, subject)
+    # row per pair, doing the cleanup (strip whitespace, drop periods and
+    # empties) once in vectorized pandas ops instead of per-row Python loops.
+    sub = df[['Namn', 'Ämnesområden']].dropna()
+    sub['subj'] = sub['Ämnesområden'].str.replace('.', '', regex=False).str.split(',')
+    edges = sub.explode('subj')
+    edges['subj'] = edges['subj'].str.strip()
+    edges = edges[edges['subj'] != '']
+
+    names = tuple(df['Namn'].unique())
+    subject_pairs = tuple(edges[['Namn', 'subj']].itertuples(index=False, name=None))
+
+    html_content = build_network_html(names, subject_pairs)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+    return html_content